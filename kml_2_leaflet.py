@@ -25,71 +25,79 @@ include the overlay with:
   - "download_ok": false
   - "http_status": <status or null>
   - "error": "<message>"
+
+Validators (ETag/Last-Modified) of downloaded overlays are kept next to the
+output folder, in .<out>.downloads.json, so later runs only re-fetch images
+that changed on the server. An overlay URL used by several sites is downloaded
+once and hard-linked into each site's overlays/ folder.
 """
 
 from __future__ import annotations
 
 import argparse
+import io
 import json
+import os
 import re
 import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Callable, Iterable, Iterator, BinaryIO
 from urllib.parse import urlparse
 
-import xml.etree.ElementTree as ET
+try:
+    # libxml2-backed parser; much faster and leaner on large KMLs
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+try:
+    # C JSON encoder; stdlib json is used when it is not installed
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # Optional HTTP/2 client for --http2 (pip install "httpx[http2]")
+    import httpx
+    import h2  # noqa: F401
+except ImportError:
+    httpx = None
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException, Timeout
+from urllib3.exceptions import HTTPError as Urllib3HTTPError, ReadTimeoutError
 
 
-# Support multiple KML namespaces
-KML_NAMESPACES = [
-    {"kml": "http://www.opengis.net/kml/2.2"},
-    {"kml": "http://earth.google.com/kml/2.2"},
-]
-
 # Target base folder for manifests/images in generated JSON paths
 POTENTIAL_BASE = "potential"
 
+# Minimum connection pool size for the shared HTTP session
+HTTP_POOL_SIZE = 32
 
-def slugify(s: str) -> str:
-    return re.sub(r"[^A-Za-z0-9_.-]+", "_", s.strip()) or "site"
+# Block size used when streaming overlay images to disk
+COPY_CHUNK_SIZE = 1 << 20
 
+# Precompiled patterns
+SLUG_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+TX_HEIGHT_RE = re.compile(r"TX Height:\s*([\d.]+)\s*m", re.I)
+HEIGHT_RE = re.compile(r"Height:\s*([\d.]+)\s*m", re.I)
 
-def find_element(root: ET.Element, xpath: str) -> Optional[ET.Element]:
-    """Try to find element using multiple namespaces, or without namespace."""
-    for ns in KML_NAMESPACES:
-        elem = root.find(xpath, ns)
-        if elem is not None:
-            return elem
-    # Try without namespace prefix
-    no_ns_xpath = xpath.replace("kml:", "")
-    elem = root.find(no_ns_xpath)
-    return elem
 
-
-def find_all_elements(root: ET.Element, xpath: str) -> List[ET.Element]:
-    """Try to find all elements using multiple namespaces, or without namespace."""
-    for ns in KML_NAMESPACES:
-        elems = root.findall(xpath, ns)
-        if elems:
-            return elems
-    # Try without namespace prefix
-    no_ns_xpath = xpath.replace("kml:", "")
-    return root.findall(no_ns_xpath)
+def slugify(s: str) -> str:
+    return SLUG_RE.sub("_", s.strip()) or "site"
 
 
 def find_text(root: ET.Element, xpath: str, default: str = "") -> str:
-    """Try to find text using multiple namespaces."""
-    for ns in KML_NAMESPACES:
-        text = root.findtext(xpath, namespaces=ns)
-        if text:
-            return text.strip()
-    # Try without namespace prefix
-    no_ns_xpath = xpath.replace("kml:", "")
-    text = root.findtext(no_ns_xpath)
+    """
+    Find stripped text, matching kml: steps in any (or no) namespace via
+    the {*} wildcard, so every KML namespace variant is covered in one lookup.
+    """
+    text = root.findtext(xpath.replace("kml:", "{*}"))
     return text.strip() if text else default
 
 
@@ -102,7 +110,7 @@ def extract_tx_height(desc: str) -> Optional[float]:
         return None
     
     # Try "TX Height: X m" pattern
-    m = re.search(r"TX Height:\s*([\d.]+)\s*m", desc, re.I)
+    m = TX_HEIGHT_RE.search(desc)
     if m:
         try:
             return float(m.group(1))
@@ -110,7 +118,7 @@ def extract_tx_height(desc: str) -> Optional[float]:
             pass
     
     # Try "Height: X m" pattern
-    m = re.search(r"Height:\s*([\d.]+)\s*m", desc, re.I)
+    m = HEIGHT_RE.search(desc)
     if m:
         try:
             return float(m.group(1))
@@ -131,189 +139,487 @@ class DownloadResult:
     ok: bool
     http_status: Optional[int]
     error: Optional[str]
+    # Cache validators from a successful (200) response, plus the size and
+    # mtime of the file written, to tell later whether dest still holds it
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_length: Optional[int] = None
+    mtime_ns: Optional[int] = None
+
+
+def download_cache_path(out_dir: Path) -> Path:
+    """
+    Where download validators for out_dir are kept: a hidden file beside it,
+    so no tool state ends up in the published output folder.
+    """
+    out_dir = out_dir.resolve()
+    return out_dir.parent / f".{out_dir.name}.downloads.json"
+
+
+def load_download_cache(path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Load {dest: {url, etag, last_modified, content_length, mtime_ns}} from a
+    previous run, dest being relative to the output folder.
+    A missing or unreadable cache just means everything is re-downloaded.
+    """
+    try:
+        cache = json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def replacement_path(dest: Path) -> Path:
+    """Unique temp path next to dest, to be os.replace()d onto it."""
+    return dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.part")
+
+
+@contextmanager
+def open_replacing(dest: Path) -> Iterator[BinaryIO]:
+    """
+    Open a new temp file next to dest for writing and os.replace() it onto
+    dest on success (it is removed on failure). dest is never written in
+    place, so other hard links to its old inode (sites sharing an overlay)
+    keep their contents, and a failed download leaves the old file intact.
+    """
+    tmp = replacement_path(dest)
+    try:
+        with open(tmp, "xb") as f:
+            yield f
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def copy_replacing(src: Path, dst: Path) -> None:
+    """shutil.copy2(src, dst), but into a temp file that then replaces dst."""
+    tmp = replacement_path(dst)
+    try:
+        shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """
+    Make dst hold the same bytes as src: a hard link when possible,
+    otherwise a copy (e.g. across filesystems).
+    """
+    try:
+        if os.path.samefile(src, dst):
+            return
+    except OSError:
+        pass  # dst does not exist yet
+    try:
+        dst.unlink(missing_ok=True)
+        os.link(src, dst)
+    except OSError:
+        copy_replacing(src, dst)
+
+
+def make_session(pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+    """
+    Build a requests.Session with a connection pool large enough to be shared
+    by all download worker threads (keep-alive, no per-request handshakes).
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 
-def download(url: str, dest: Path, timeout_s: int = 120) -> DownloadResult:
+def conditional_headers(url: str, dest: Path, cached: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    If-None-Match / If-Modified-Since headers for a cached download,
+    provided dest was last fetched from url and still has the size and
+    mtime recorded then (i.e. nothing has rewritten it since).
+    """
+    headers: Dict[str, str] = {}
+    if cached and cached.get("url") == url:
+        try:
+            st = dest.stat()
+            intact = (
+                st.st_size == cached.get("content_length")
+                and st.st_mtime_ns == cached.get("mtime_ns")
+            )
+        except OSError:
+            intact = False
+        if intact:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+    return headers
+
+
+def status_result(status: int, conditional: bool) -> Optional[DownloadResult]:
+    """
+    DownloadResult for responses that carry no body to save
+    (304 on a conditional GET, 404, other non-2xx), else None.
+    """
+    if status == 304 and conditional:
+        return DownloadResult(ok=True, http_status=304, error=None)
+    if status == 404:
+        return DownloadResult(ok=False, http_status=404, error="404 Not Found")
+    if status < 200 or status >= 300:
+        return DownloadResult(ok=False, http_status=status, error=f"HTTP {status}")
+    return None
+
+
+def download(
+    url: str,
+    dest: Path,
+    timeout_s: int = 120,
+    session: Optional[requests.Session] = None,
+    cached: Optional[Dict[str, Any]] = None,
+) -> DownloadResult:
     """
     Download url -> dest. Returns DownloadResult.
     Gracefully handles HTTP errors (including 404) and network errors.
+    Uses the given session if provided, so connections can be reused.
+
+    If `cached` validators are given and dest still holds that download,
+    a conditional GET is sent and a 304 leaves the existing file in place.
+    dest's parent folder must already exist.
     """
-    dest.parent.mkdir(parents=True, exist_ok=True)
+    http = session if session is not None else requests
+    headers = conditional_headers(url, dest, cached)
 
     try:
-        with requests.get(url, stream=True, timeout=timeout_s) as r:
+        with http.get(url, stream=True, timeout=timeout_s, headers=headers) as r:
             status = r.status_code
+            early = status_result(status, bool(headers))
+            if early is not None:
+                return early
+
+            # Let urllib3 undo any Content-Encoding, then copy in 1 MiB blocks
+            r.raw.decode_content = True
+            with open_replacing(dest) as f:
+                shutil.copyfileobj(r.raw, f, length=COPY_CHUNK_SIZE)
+            st = dest.stat()
+
+            return DownloadResult(
+                ok=True,
+                http_status=status,
+                error=None,
+                etag=r.headers.get("ETag"),
+                last_modified=r.headers.get("Last-Modified"),
+                content_length=st.st_size,
+                mtime_ns=st.st_mtime_ns,
+            )
+
+    except (Timeout, ReadTimeoutError):
+        return DownloadResult(ok=False, http_status=None, error=f"Timeout after {timeout_s}s")
+    except (RequestException, Urllib3HTTPError) as e:
+        # r.raw reads raise urllib3 errors directly, not requests' wrappers
+        return DownloadResult(ok=False, http_status=None, error=str(e))
+    except OSError as e:
+        return DownloadResult(ok=False, http_status=None, error=f"Filesystem error: {e}")
 
-            if status == 404:
-                return DownloadResult(ok=False, http_status=404, error="404 Not Found")
-            if status < 200 or status >= 300:
-                return DownloadResult(ok=False, http_status=status, error=f"HTTP {status}")
-
-            with open(dest, "wb") as f:
-                for chunk in r.iter_content(chunk_size=1024 * 128):
-                    if chunk:
-                        f.write(chunk)
 
-            return DownloadResult(ok=True, http_status=status, error=None)
+def make_http2_client(timeout_s: int, pool_size: int = HTTP_POOL_SIZE) -> "httpx.Client":
+    """
+    Build an httpx.Client speaking HTTP/2, so overlay requests to the same
+    host are multiplexed over one connection. Safe to share across threads.
+    """
+    return httpx.Client(
+        http2=True,
+        follow_redirects=True,
+        timeout=timeout_s,
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+    )
+
+
+def download_http2(
+    url: str,
+    dest: Path,
+    timeout_s: int,
+    client: "httpx.Client",
+    cached: Optional[Dict[str, Any]] = None,
+) -> DownloadResult:
+    """
+    Same contract as download(), using a shared httpx HTTP/2 client.
+    The client's own timeout applies; timeout_s is used for messages.
+    """
+    headers = conditional_headers(url, dest, cached)
 
-    except Timeout:
+    try:
+        with client.stream("GET", url, headers=headers) as r:
+            status = r.status_code
+            early = status_result(status, bool(headers))
+            if early is not None:
+                return early
+
+            with open_replacing(dest) as f:
+                for chunk in r.iter_bytes(COPY_CHUNK_SIZE):
+                    f.write(chunk)
+            st = dest.stat()
+
+            return DownloadResult(
+                ok=True,
+                http_status=status,
+                error=None,
+                etag=r.headers.get("ETag"),
+                last_modified=r.headers.get("Last-Modified"),
+                content_length=st.st_size,
+                mtime_ns=st.st_mtime_ns,
+            )
+
+    except httpx.TimeoutException:
         return DownloadResult(ok=False, http_status=None, error=f"Timeout after {timeout_s}s")
-    except RequestException as e:
+    except (httpx.HTTPError, httpx.InvalidURL, httpx.StreamError, httpx.CookieConflict) as e:
+        # The last three are not HTTPError subclasses (e.g. a malformed href)
         return DownloadResult(ok=False, http_status=None, error=str(e))
     except OSError as e:
         return DownloadResult(ok=False, http_status=None, error=f"Filesystem error: {e}")
 
 
-def get_element_name(elem: ET.Element) -> Optional[str]:
+def download_in_order(
+    fetch: Callable[..., DownloadResult],
+    urls: List[str],
+    dest: Path,
+    timeout_s: int,
+    client: Any,
+    cached: Optional[Dict[str, Any]] = None,
+) -> List[DownloadResult]:
+    """
+    Download several URLs to the same dest one after another, in order,
+    with fetch (download or download_http2), so the last successful one is
+    what ends up on disk. Runs as a single pool task so no two downloads
+    ever write the same path concurrently.
+    """
+    return [fetch(url, dest, timeout_s, client, cached) for url in urls]
+
+
+def update_download_cache(cache: Dict[str, Dict[str, Any]], key: str, url: str, res: DownloadResult) -> None:
+    """
+    Record the validators of a download from url into cache[key], or drop
+    the entry when the file at key may no longer match them.
+    A 304 leaves the entry as it is.
+    """
+    if res.ok and res.http_status == 304:
+        return
+    if res.ok and (res.etag or res.last_modified):
+        cache[key] = {
+            "url": url,
+            "etag": res.etag,
+            "last_modified": res.last_modified,
+            "content_length": res.content_length,
+            "mtime_ns": res.mtime_ns,
+        }
+    else:
+        cache.pop(key, None)
+
+
+def apply_download_result(entry: Dict[str, Any], image_rel: str, res: DownloadResult) -> None:
+    """Copy a DownloadResult into a manifest overlay entry."""
+    entry["http_status"] = res.http_status
+    entry["download_ok"] = res.ok
+    entry["error"] = res.error
+    entry["image"] = image_rel if res.ok else None
+
+
+def get_element_name(children: Dict[str, ET.Element]) -> Optional[str]:
     """
-    Get name from element, checking both <name> and <n> tags.
+    Get name from an element's child_map(), checking both <name> and <n> tags.
     """
-    # Check for <name> tag (with various namespaces)
-    name = find_text(elem, "kml:name")
+    # Check for <name> tag
+    name = child_text(children, "name")
     if name:
         return name
     
     # Check for <n> tag (non-standard but used in some KMLs)
-    n_elem = elem.find("n")
-    if n_elem is not None and n_elem.text:
-        return n_elem.text.strip()
+    n = child_text(children, "n")
+    if n:
+        return n
     
     return None
 
 
+def json_chunks(obj: Any) -> Iterator[bytes]:
+    """
+    obj as indented UTF-8 JSON, in pieces: orjson's single bytes object, or
+    the stdlib encoder's output as it is produced (never one big str).
+    """
+    if orjson is not None:
+        yield orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        return
+    for piece in json.JSONEncoder(indent=2, ensure_ascii=False).iterencode(obj):
+        yield piece.encode("utf-8")
+
+
+def same_contents(path: Path, chunks: Iterable[bytes]) -> bool:
+    """
+    True if path holds exactly the concatenation of chunks. The file is read
+    alongside the chunks and the comparison stops at the first difference,
+    or as soon as the chunks run past the file's size.
+    """
+    try:
+        with open(path, "rb") as f:
+            remaining = os.fstat(f.fileno()).st_size
+            for chunk in chunks:
+                remaining -= len(chunk)
+                if remaining < 0 or f.read(len(chunk)) != chunk:
+                    return False
+            return remaining == 0 and f.read(1) == b""
+    except OSError:
+        return False
+
+
+def write_json(path: Path, obj: Any) -> bool:
+    """
+    Write obj to path as indented UTF-8 JSON (orjson when available).
+    An existing file with identical bytes is left untouched (mtime kept
+    for web caches). Returns False if the write was skipped.
+    """
+    if same_contents(path, json_chunks(obj)):
+        return False
+    with open_replacing(path) as f:
+        for chunk in json_chunks(obj):
+            f.write(chunk)
+    return True
+
+
+def local_name(tag: Any) -> str:
+    """Return tag without its {namespace} prefix ("" for comments/PIs)."""
+    return tag.rpartition("}")[2] if isinstance(tag, str) else ""
+
+
+def child_map(elem: ET.Element) -> Dict[str, ET.Element]:
+    """
+    Map local tag name -> first direct child of elem, in a single pass.
+    Lets callers pick several fields without one find() per field.
+    """
+    children: Dict[str, ET.Element] = {}
+    for child in elem:
+        children.setdefault(local_name(child.tag), child)
+    return children
+
+
+def child_text(children: Dict[str, ET.Element], tag: str) -> str:
+    """Stripped text of the named child from child_map(), or ""."""
+    child = children.get(tag)
+    if child is None or not child.text:
+        return ""
+    return child.text.strip()
+
+
+def parse_ground_overlay(go_children: Dict[str, ET.Element], png_filename: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a single GroundOverlay from its child_map().
+    Returns None if it has no LatLonBox.
+    """
+    # Get bounds from LatLonBox
+    box = go_children.get("LatLonBox")
+    if box is None:
+        return None
+    box_children = child_map(box)
+
+    def get_bound(tag: str) -> float:
+        text = child_text(box_children, tag)
+        if not text:
+            raise RuntimeError(f"Missing <LatLonBox><{tag}>")
+        return float(text)
+
+    # Get href from Icon (may be relative path)
+    href = None
+    icon = go_children.get("Icon")
+    if icon is not None:
+        href = child_text(child_map(icon), "href") or None
+
+    # Get rotation if present
+    rotation = None
+    rot_text = child_text(box_children, "rotation")
+    if rot_text:
+        rotation = float(rot_text)
+
+    return {
+        "name": None,  # filled in with the site name once the Document is parsed
+        "href": href,
+        "bounds": [
+            [get_bound("south"), get_bound("west")],
+            [get_bound("north"), get_bound("east")]
+        ],
+        "rotation": rotation,
+        "png_filename": png_filename
+    }
+
+
 def parse_kml(path: Path) -> Dict[str, Any]:
     """
     Parse a KML and return:
       site_name, lat, lon, antenna_agl_m, overlays[]
     overlays contains: name, href, bounds[[s,w],[n,e]]
-    """
-    content = path.read_text(encoding="utf-8", errors="replace")
-    root = ET.fromstring(content)
 
-    # Get site name from Document/n or Document/name, or fallback to filename
-    doc = find_element(root, ".//kml:Document")
-    if doc is None:
-        # Try without namespace
-        doc = root.find(".//Document")
-    
+    The file is streamed with iterparse; Placemark and GroundOverlay
+    elements are cleared once handled so memory stays flat on large KMLs.
+    """
     site_name = None
-    if doc is not None:
-        site_name = get_element_name(doc)
-    
+    placemark_seen = False
+    placemark_name = None
+    coord = ""
+    antenna_agl_m = None
+    overlays: List[Dict[str, Any]] = []
+    # Image name is KML filename with .png extension
+    png_filename = path.stem + ".png"
+
+    # Decode leniently so stray non-UTF-8 bytes don't abort the parse, then
+    # hand the parser UTF-8 bytes (lxml rejects str with an encoding declaration)
+    content = path.read_text(encoding="utf-8", errors="replace").encode("utf-8")
+    with io.BytesIO(content) as f:
+        for _event, elem in ET.iterparse(f, events=("end",)):
+            tag = local_name(elem.tag)
+
+            if tag == "GroundOverlay":
+                children = child_map(elem)
+
+                # Extract TX Height from the first GroundOverlay that has one
+                if antenna_agl_m is None:
+                    # Prefer description, fall back to name
+                    desc = child_text(children, "description") or get_element_name(children)
+                    antenna_agl_m = extract_tx_height(desc if desc else "")
+
+                overlay = parse_ground_overlay(children, png_filename)
+                if overlay is not None:
+                    overlays.append(overlay)
+                elem.clear()
+
+            elif tag == "Placemark":
+                # First Placemark holds the site coordinates
+                if not placemark_seen:
+                    placemark_seen = True
+                    placemark_name = get_element_name(child_map(elem))
+                    coord = find_text(elem, ".//kml:Point/kml:coordinates")
+                elem.clear()
+
+            elif tag == "Document":
+                # Outermost Document ends last, so its name wins
+                site_name = get_element_name(child_map(elem))
+
     # Fallback to filename (without extension)
     if not site_name:
         site_name = path.stem
 
-    # Find Placemark for coordinates
-    placemark = find_element(root, ".//kml:Placemark")
-    if placemark is None:
-        placemark = root.find(".//Placemark")
-    
-    if placemark is None:
+    if not placemark_seen:
         raise RuntimeError("No <Placemark> found")
 
-    placemark_name = get_element_name(placemark)
-
-    # Get coordinates
-    coord = find_text(placemark, ".//kml:Point/kml:coordinates")
-    if not coord:
-        point = placemark.find(".//Point")
-        if point is not None:
-            coord_elem = point.find("coordinates")
-            if coord_elem is not None and coord_elem.text:
-                coord = coord_elem.text.strip()
-    
     if not coord:
         raise RuntimeError("No <Point><coordinates> found for site lat/lon")
 
-    lon, lat = map(float, coord.split(",")[:2])
-
-    # Extract TX Height from GroundOverlay description
-    antenna_agl_m = 10.0  # default
-    
-    ground_overlays = find_all_elements(root, ".//kml:GroundOverlay")
-    if not ground_overlays:
-        ground_overlays = root.findall(".//GroundOverlay")
-    
-    for go in ground_overlays:
-        desc = get_element_name(go)  # Check name first
-        desc_elem = go.find("description")
-        if desc_elem is not None and desc_elem.text:
-            desc = desc_elem.text
-        
-        height = extract_tx_height(desc if desc else "")
-        if height is not None:
-            antenna_agl_m = height
-            break
-
-    # Parse overlays - image name is KML filename with .png extension
-    overlays: List[Dict[str, Any]] = []
-    png_filename = path.stem + ".png"
-    
-    for go in ground_overlays:
-        # Get bounds from LatLonBox
-        box = go.find("LatLonBox")
-        if box is None:
-            for ns in KML_NAMESPACES:
-                box = go.find("kml:LatLonBox", ns)
-                if box is not None:
-                    break
-        
-        if box is None:
-            continue
+    # "lon,lat[,alt]" - partition avoids building a list of every field
+    lon_s, _, rest = coord.partition(",")
+    lat_s = rest.partition(",")[0]
+    lon, lat = float(lon_s), float(lat_s)
 
-        def get_bound(tag: str) -> float:
-            # Try direct child
-            elem = box.find(tag)
-            if elem is not None and elem.text:
-                return float(elem.text.strip())
-            # Try with namespace
-            for ns in KML_NAMESPACES:
-                text = box.findtext(f"kml:{tag}", namespaces=ns)
-                if text:
-                    return float(text.strip())
-            raise RuntimeError(f"Missing <LatLonBox><{tag}>")
+    if antenna_agl_m is None:
+        antenna_agl_m = 10.0  # default
 
-        # Get href from Icon (may be relative path)
-        href = None
-        icon = go.find("Icon")
-        if icon is None:
-            for ns in KML_NAMESPACES:
-                icon = go.find("kml:Icon", ns)
-                if icon is not None:
-                    break
-        
-        if icon is not None:
-            href_elem = icon.find("href")
-            if href_elem is None:
-                for ns in KML_NAMESPACES:
-                    href_elem = icon.find("kml:href", ns)
-                    if href_elem is not None:
-                        break
-            if href_elem is not None and href_elem.text:
-                href = href_elem.text.strip()
-
-        # Get rotation if present
-        rotation = None
-        rot_elem = box.find("rotation")
-        if rot_elem is None:
-            for ns in KML_NAMESPACES:
-                rot_elem = box.find("kml:rotation", ns)
-                if rot_elem is not None:
-                    break
-        if rot_elem is not None and rot_elem.text:
-            rotation = float(rot_elem.text.strip())
-
-        overlays.append({
-            "name": site_name,
-            "href": href,
-            "bounds": [
-                [get_bound("south"), get_bound("west")],
-                [get_bound("north"), get_bound("east")]
-            ],
-            "rotation": rotation,
-            "png_filename": png_filename
-        })
+    for ov in overlays:
+        ov["name"] = site_name
 
     return {
         "site_name": site_name,
@@ -326,12 +632,43 @@ def parse_kml(path: Path) -> Dict[str, Any]:
     }
 
 
+def plan_site(kml: Path) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Parse one KML in a worker process.
+    Returns (info, None) on success or (None, error message) on failure,
+    so a bad KML does not abort the whole pool.
+    """
+    try:
+        return parse_kml(kml), None
+    except Exception as e:
+        return None, str(e)
+
+
+def plan_sites(kml_files: List[Path], jobs: int) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Parse all KMLs, spread across up to `jobs` processes.
+    Small batches are parsed in-process to avoid pool start-up cost.
+    """
+    if jobs <= 1 or len(kml_files) < 2:
+        return [plan_site(kml) for kml in kml_files]
+
+    jobs = min(jobs, len(kml_files))
+    chunksize = max(1, len(kml_files) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pp:
+        return list(pp.map(plan_site, kml_files, chunksize=chunksize))
+
+
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("-i", "--input", default=".", help="Folder containing KML files (default: .)")
     ap.add_argument("-o", "--out", default="out", help="Output folder (default: out)")
     ap.add_argument("--timeout", type=int, default=120, help="Download timeout seconds (default: 120)")
     ap.add_argument("--skip-downloads", action="store_true", help="Do not download PNGs; still writes manifests")
+    ap.add_argument("--workers", type=int, default=8, help="Parallel download threads (default: 8)")
+    ap.add_argument("--http2", action="store_true",
+                    help='Download over HTTP/2 with httpx (needs: pip install "httpx[http2]")')
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="Parallel KML parsing processes; only pays off for large batches (default: 1)")
     args = ap.parse_args()
 
     in_dir = Path(args.input)
@@ -347,13 +684,18 @@ def main() -> int:
     # Collect relative manifest paths for index.json
     index_manifests: List[str] = []
 
-    for kml in kml_files:
+    # (manifest, site_dir) per parsed site, written once downloads finish
+    sites: List[Tuple[Dict[str, Any], Path]] = []
+    # dest -> [(href, entry, image_rel)] in KML order, across all sites
+    pending: Dict[Path, List[Tuple[str, Dict[str, Any], str]]] = {}
+
+    plans = plan_sites(kml_files, args.jobs)
+
+    for kml, (info, parse_error) in zip(kml_files, plans):
         print(f"\nProcessing: {kml.name}")
 
-        try:
-            info = parse_kml(kml)
-        except Exception as e:
-            print(f"  ❌ Failed to parse KML: {e}")
+        if info is None:
+            print(f"  ❌ Failed to parse KML: {parse_error}")
             continue
 
         site_name = info["site_name"]
@@ -361,7 +703,8 @@ def main() -> int:
 
         site_dir = out_dir / site_slug
         overlays_dir = site_dir / "overlays"
-        site_dir.mkdir(parents=True, exist_ok=True)
+        # Also creates site_dir; done once here rather than per overlay
+        overlays_dir.mkdir(parents=True, exist_ok=True)
 
         manifest_overlays: List[Dict[str, Any]] = []
 
@@ -388,11 +731,9 @@ def main() -> int:
                 # No remote URL - look for local file with same name as KML
                 source_png = kml.parent / png_filename
                 dest_png = overlays_dir / png_filename
-                
-                overlays_dir.mkdir(parents=True, exist_ok=True)
-                
+
                 if source_png.exists():
-                    shutil.copy2(source_png, dest_png)
+                    copy_replacing(source_png, dest_png)
                     entry["image"] = image_rel
                     entry["download_ok"] = True
                     entry["error"] = None
@@ -416,26 +757,14 @@ def main() -> int:
                     manifest_overlays.append(entry)
                     continue
 
-                res = download(href, dest, timeout_s=args.timeout)
-
-                entry["http_status"] = res.http_status
-                entry["download_ok"] = res.ok
-                entry["error"] = res.error
-
-                if res.ok:
-                    entry["image"] = image_rel
-                    print(f"  ✅ PNG: {png_filename}")
-                else:
-                    print(f"  ⚠️  PNG failed: {href} -> {res.error} (status={res.http_status})")
+                pending.setdefault(dest, []).append((href, entry, image_rel))
             else:
                 # Local file reference - look for PNG in same directory as KML
                 source_png = kml.parent / png_filename
                 dest_png = overlays_dir / png_filename
-                
-                overlays_dir.mkdir(parents=True, exist_ok=True)
-                
+
                 if source_png.exists():
-                    shutil.copy2(source_png, dest_png)
+                    copy_replacing(source_png, dest_png)
                     entry["image"] = image_rel
                     entry["download_ok"] = True
                     entry["error"] = None
@@ -461,18 +790,116 @@ def main() -> int:
             },
             "overlays": manifest_overlays
         }
+        sites.append((manifest, site_dir))
+
+    # Download every remote overlay from all KMLs through one pool/session.
+    # Overlays of one KML all save to <kml stem>.png, so a dest with several
+    # overlays is downloaded one URL after another in KML order (last one
+    # wins) in a single task. Dests with one overlay are grouped by URL:
+    # each distinct URL is fetched once, into the first site using it, and
+    # the other sites sharing it get a hard link to that file.
+    targets: Dict[str, List[Tuple[Path, Dict[str, Any], str]]] = {}
+    chains: Dict[Path, List[Tuple[str, Dict[str, Any], str]]] = {}
+    for dest, items in pending.items():
+        if len(items) == 1:
+            href, entry, image_rel = items[0]
+            targets.setdefault(href, []).append((dest, entry, image_rel))
+        else:
+            chains[dest] = items
+
+    if pending:
+        print(f"\nDownloading {len(targets) + sum(map(len, chains.values()))} URL(s) "
+              f"for {sum(map(len, pending.values()))} overlay(s)...")
+        cache_path = download_cache_path(out_dir)
+        cache = load_download_cache(cache_path)
+
+        workers = max(1, args.workers)
+        pool_size = max(workers, HTTP_POOL_SIZE)
+        use_http2 = args.http2 and httpx is not None
+        if args.http2 and not use_http2:
+            print("  ⚠️  --http2 needs httpx[http2]; using requests")
+        if use_http2:
+            client, fetch = make_http2_client(args.timeout, pool_size), download_http2
+        else:
+            client, fetch = make_session(pool_size), download
+
+        with client, ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = {}
+            for href, dests in targets.items():
+                primary = dests[0][0]
+                key = primary.relative_to(out_dir).as_posix()
+                fut = ex.submit(fetch, href, primary, args.timeout, client, cache.get(key))
+                futures[fut] = ("url", href, key)
+            for dest, items in chains.items():
+                key = dest.relative_to(out_dir).as_posix()
+                urls = [href for href, _, _ in items]
+                fut = ex.submit(download_in_order, fetch, urls, dest, args.timeout, client, cache.get(key))
+                futures[fut] = ("dest", dest, key)
+
+            for fut in as_completed(futures):
+                kind, target, key = futures[fut]
+
+                if kind == "dest":
+                    # Same-destination chain: one file per site, no link sharing
+                    items = chains[target]
+                    results = fut.result()
+                    for (href, entry, image_rel), res in zip(items, results):
+                        apply_download_result(entry, image_rel, res)
+                        if res.http_status == 304:
+                            print(f"  ✅ PNG unchanged: {target} <- {href}")
+                        elif res.ok:
+                            print(f"  ✅ PNG: {target} <- {href}")
+                        else:
+                            print(f"  ⚠️  PNG failed: {href} -> {res.error} (status={res.http_status})")
+                    # Validators of whatever the last download left on disk
+                    update_download_cache(cache, key, items[-1][0], results[-1])
+                    continue
+
+                href = target
+                res = fut.result()
+                update_download_cache(cache, key, href, res)
+                primary = targets[href][0][0]
+
+                for dest, entry, image_rel in targets[href]:
+                    apply_download_result(entry, image_rel, res)
+
+                    if not res.ok:
+                        print(f"  ⚠️  PNG failed: {href} -> {res.error} (status={res.http_status})")
+                        continue
+
+                    if dest != primary:
+                        try:
+                            link_or_copy(primary, dest)
+                        except OSError as e:
+                            apply_download_result(entry, image_rel, DownloadResult(
+                                ok=False, http_status=res.http_status, error=f"Filesystem error: {e}"))
+                            print(f"  ⚠️  PNG copy failed: {primary} -> {dest}: {e}")
+                            continue
+
+                    if res.http_status == 304:
+                        print(f"  ✅ PNG unchanged: {dest} <- {href}")
+                    else:
+                        print(f"  ✅ PNG: {dest} <- {href}")
+
+        write_json(cache_path, cache)
 
+    print()
+    for manifest, site_dir in sites:
         manifest_path = site_dir / "manifest.json"
-        manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
-        print(f"  ✔ Wrote: {manifest_path}")
+        if write_json(manifest_path, manifest):
+            print(f"✔ Wrote: {manifest_path}")
+        else:
+            print(f"✔ Unchanged: {manifest_path}")
 
-        index_manifests.append(f"{POTENTIAL_BASE}/{site_name}/manifest.json")
+        index_manifests.append(f"{POTENTIAL_BASE}/{manifest['site']['name']}/manifest.json")
 
     # Write index.json at output root
     index_path = out_dir / "index.json"
     index = {"manifests": index_manifests}
-    index_path.write_text(json.dumps(index, indent=2), encoding="utf-8")
-    print(f"\n✔ Wrote: {index_path}")
+    if write_json(index_path, index):
+        print(f"✔ Wrote: {index_path}")
+    else:
+        print(f"✔ Unchanged: {index_path}")
 
     print("\nDone.")
     return 0